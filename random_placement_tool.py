@@ -1,89 +1,615 @@
 import bpy
 import random
 import math
-import bmesh
-from mathutils import Vector, Matrix
+from mathutils import Vector, Matrix, Quaternion
+from bpy.app.handlers import persistent
+from bpy_extras.io_utils import ExportHelper, ImportHelper
+import numpy as np
 import json
+import os
+import hashlib
+import shutil
+import struct
+import time
+from collections import OrderedDict
 
-# Fonction pour obtenir un point aléatoire sur la surface d'un objet
-def get_random_point_on_surface(obj, seed=None):
-    if seed is not None:
-        random.seed(seed)
-        
-    bm = bmesh.new()
-    depsgraph = bpy.context.evaluated_depsgraph_get()
-    mesh = obj.evaluated_get(depsgraph).to_mesh()
-    bm.from_mesh(mesh)
-    bm.transform(obj.matrix_world)
-    bm.faces.ensure_lookup_table()
-    
-    if len(bm.faces) == 0:
-        bm.free()
-        obj.to_mesh_clear()
-        return obj.location, Vector((0, 0, 1))
-    
-    total_area = sum(f.calc_area() for f in bm.faces)
-    rand_area = random.uniform(0, total_area)
-    
-    cumulative_area = 0
-    selected_face = None
-    for face in bm.faces:
-        cumulative_area += face.calc_area()
-        if cumulative_area >= rand_area:
-            selected_face = face
+# Cache des échantillonneurs : tableaux préparés stockés sur disque et ouverts en mmap
+SAMPLER_CACHE_VERSION = 1
+SAMPLER_ARRAYS = ("triangles", "normals", "cumulative_areas")
+SAMPLER_MEMORY_ENTRIES = 8
+sampler_cache = OrderedDict()
+
+def get_sampler_cache_dir():
+    return bpy.utils.user_resource('DATAFILES', path="random_placement_cache", create=True)
+
+# Calcule une clé à partir du maillage évalué et de la matrice monde
+def compute_sampler_key(mesh, matrix_world):
+    coords = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", coords)
+    loop_vertices = np.empty(len(mesh.loops), dtype=np.int32)
+    mesh.loops.foreach_get("vertex_index", loop_vertices)
+    loop_totals = np.empty(len(mesh.polygons), dtype=np.int32)
+    mesh.polygons.foreach_get("loop_total", loop_totals)
+    
+    digest = hashlib.sha1(struct.pack("<I", SAMPLER_CACHE_VERSION))
+    digest.update(np.array(matrix_world, dtype=np.float64).tobytes())
+    digest.update(coords.tobytes())
+    digest.update(loop_vertices.tobytes())
+    digest.update(loop_totals.tobytes())
+    return digest.hexdigest()
+
+# Triangule le maillage et prépare les tableaux d'échantillonnage en coordonnées monde
+def build_sampler_arrays(mesh, matrix_world):
+    mesh.calc_loop_triangles()
+    coords = np.empty(len(mesh.vertices) * 3, dtype=np.float64)
+    mesh.vertices.foreach_get("co", coords)
+    indices = np.empty(len(mesh.loop_triangles) * 3, dtype=np.int32)
+    mesh.loop_triangles.foreach_get("vertices", indices)
+    
+    matrix = np.array(matrix_world, dtype=np.float64)
+    coords = coords.reshape(-1, 3) @ matrix[:3, :3].T + matrix[:3, 3]
+    triangles = coords[indices].reshape(-1, 3, 3)
+    
+    cross = np.cross(triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0])
+    lengths = np.linalg.norm(cross, axis=1)
+    normals = np.zeros_like(cross)
+    valid = lengths > 0
+    normals[valid] = cross[valid] / lengths[valid, None]
+    
+    return {
+        "triangles": triangles,
+        "normals": normals,
+        "cumulative_areas": np.cumsum(lengths * 0.5),
+    }
+
+# Supprime les entrées les plus anciennes quand le cache dépasse sa taille maximale
+def evict_sampler_cache(cache_dir, max_size, keep=None):
+    entries = []
+    total_size = 0
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        if not os.path.isdir(path):
+            continue
+        size = sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+        entries.append((os.path.getmtime(path), size, name, path))
+        total_size += size
+    
+    for _, size, name, path in sorted(entries):
+        if total_size <= max_size:
             break
+        if name == keep:
+            continue
+        shutil.rmtree(path, ignore_errors=True)
+        total_size -= size
+
+# Charge les tableaux depuis le disque, ou les calcule et les enregistre
+def load_sampler_arrays(key, mesh, matrix_world, max_size):
+    cache_dir = get_sampler_cache_dir()
+    entry_dir = os.path.join(cache_dir, key)
+    paths = {name: os.path.join(entry_dir, name + ".npy") for name in SAMPLER_ARRAYS}
+    
+    if all(os.path.exists(path) for path in paths.values()):
+        try:
+            arrays = {name: np.load(path, mmap_mode="r") for name, path in paths.items()}
+            os.utime(entry_dir)
+            return arrays
+        except (OSError, ValueError):
+            shutil.rmtree(entry_dir, ignore_errors=True)
+    
+    arrays = build_sampler_arrays(mesh, matrix_world)
+    try:
+        # Écrit dans un dossier temporaire puis le renomme pour ne jamais laisser d'entrée partielle
+        temp_dir = f"{entry_dir}.{os.getpid()}.tmp"
+        os.makedirs(temp_dir, exist_ok=True)
+        for name, array in arrays.items():
+            np.save(os.path.join(temp_dir, name + ".npy"), array)
+        
+        # Une entrée incomplète laissée par une exécution précédente bloquerait le renommage
+        if os.path.isdir(entry_dir):
+            shutil.rmtree(entry_dir, ignore_errors=True)
+        os.replace(temp_dir, entry_dir)
+        evict_sampler_cache(cache_dir, max_size, keep=key)
+    except OSError:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    return arrays
+
+# Retourne l'échantillonneur de la surface évaluée d'un objet
+def get_surface_sampler(obj):
+    props = bpy.context.scene.random_placement_props
+    depsgraph = bpy.context.evaluated_depsgraph_get()
+    obj_eval = obj.evaluated_get(depsgraph)
+    mesh = obj_eval.to_mesh()
+    try:
+        key = compute_sampler_key(mesh, obj.matrix_world)
+        arrays = sampler_cache.get(key)
+        if arrays is not None:
+            # Les échantillonneurs utilisés récemment restent en fin de liste
+            sampler_cache.move_to_end(key)
+        else:
+            if props.use_sampler_cache:
+                arrays = load_sampler_arrays(key, mesh, obj.matrix_world, props.sampler_cache_size * 1024 * 1024)
+            else:
+                arrays = build_sampler_arrays(mesh, obj.matrix_world)
+            sampler_cache[key] = arrays
+            if len(sampler_cache) > SAMPLER_MEMORY_ENTRIES:
+                sampler_cache.popitem(last=False)
+    finally:
+        obj_eval.to_mesh_clear()
+    return arrays
+
+@persistent
+def clear_sampler_cache(dummy):
+    sampler_cache.clear()
+
+# Génère les points et normales d'un groupe sur la surface cible
+def generate_points_data(target_obj, seed, count):
+    sampler = get_surface_sampler(target_obj)
+    cumulative_areas = sampler["cumulative_areas"]
+    
+    if len(cumulative_areas) == 0 or cumulative_areas[-1] <= 0:
+        location = target_obj.location
+        return [{"point": [location.x, location.y, location.z], "normal": [0.0, 0.0, 1.0]} for _ in range(count)]
+    
+    # Tirage vectorisé : le point i ne dépend que du seed, pas du nombre d'instances
+    rng = np.random.default_rng(seed)
+    samples = rng.random((count, 3))
+    faces = np.searchsorted(cumulative_areas, samples[:, 0] * cumulative_areas[-1], side="right")
+    faces = np.minimum(faces, len(cumulative_areas) - 1)
+    
+    u = samples[:, 1]
+    v = samples[:, 2]
+    flip = u + v > 1
+    u[flip] = 1 - u[flip]
+    v[flip] = 1 - v[flip]
+    w = 1 - u - v
+    
+    triangles = sampler["triangles"][faces]
+    points = triangles[:, 0] * u[:, None] + triangles[:, 1] * v[:, None] + triangles[:, 2] * w[:, None]
+    normals = sampler["normals"][faces]
+    
+    return [{"point": point, "normal": normal} for point, normal in zip(points.tolist(), normals.tolist())]
+
+# Retrouve un groupe à partir de son identifiant
+def find_group(props, group_id):
+    return next((g for g in props.placement_groups if g.group_id == group_id), None)
+
+# Cache en mémoire des points décodés, partagé par les groupes qui référencent le même tampon
+points_cache = {}
+
+# Les identifiants de groupe sont propres à chaque scène : la clé inclut la scène
+def get_points_key(props, group_id):
+    return (props.id_data.as_pointer(), group_id)
+
+# Retourne le groupe qui possède réellement le tampon de points d'un groupe
+def get_points_owner(props, group):
+    if group.points_source_id:
+        owner = find_group(props, group.points_source_id)
+        if owner is not None:
+            return owner
+    return group
+
+# Charge les points d'un groupe en ne décodant le JSON qu'une fois par tampon
+def load_group_points(props, group):
+    owner = get_points_owner(props, group)
+    key = get_points_key(props, owner.group_id)
+    entry = points_cache.get(key)
+    if entry is None or entry["version"] != owner.points_version:
+        points_json = owner.points_data
+        points = json.loads(points_json) if points_json else []
+        refs = entry["refs"] if entry is not None else set()
+        entry = {"version": owner.points_version, "points": points, "refs": refs}
+        points_cache[key] = entry
+        fill_data_size(owner)
+    entry["refs"].add(group.group_id)
+    return entry["points"]
+
+# Les groupes des anciens fichiers n'ont pas de taille enregistrée : elle est déduite du JSON
+def fill_data_size(group):
+    if not group.data_size and not group.points_source_id and group.points_data:
+        group.data_size = len(group.points_data)
+
+@persistent
+def fill_data_sizes_on_load(dummy):
+    for scene in bpy.data.scenes:
+        for group in scene.random_placement_props.placement_groups:
+            fill_data_size(group)
+
+# Retire un groupe des compteurs de références du cache
+def release_group_points(props, group_id):
+    scene_key = props.id_data.as_pointer()
+    for key in [key for key in points_cache if key[0] == scene_key]:
+        entry = points_cache[key]
+        entry["refs"].discard(group_id)
+        if not entry["refs"]:
+            del points_cache[key]
+
+# Vide le cache des points d'une scène
+def clear_scene_points(props):
+    scene_key = props.id_data.as_pointer()
+    for key in [key for key in points_cache if key[0] == scene_key]:
+        del points_cache[key]
+
+# Copie le tampon d'un groupe vers ses dépendants avant qu'il ne soit modifié ou supprimé
+def materialize_dependents(props, group):
+    dependents = [g for g in props.placement_groups
+                  if g.points_source_id == group.group_id and g.group_id != group.group_id]
+    if not dependents:
+        return
+    
+    # Le premier dépendant devient propriétaire, les autres le référencent
+    new_owner = dependents[0]
+    new_owner.points_data = group.points_data
+    new_owner.points_source_id = 0
+    new_owner.points_version = group.points_version
+    new_owner.data_size = group.data_size
+    for dependent in dependents[1:]:
+        dependent.points_source_id = new_owner.group_id
+    
+    entry = points_cache.get(get_points_key(props, group.group_id))
+    if entry is not None and entry["version"] == group.points_version:
+        refs = {dependent.group_id for dependent in dependents}
+        points_cache[get_points_key(props, new_owner.group_id)] = {"version": new_owner.points_version, "points": entry["points"], "refs": refs}
+        entry["refs"] -= refs
+
+# Stocke de nouveaux points pour un groupe (copie à l'écriture pour les tampons partagés)
+def store_group_points(props, group, points):
+    materialize_dependents(props, group)
+    release_group_points(props, group.group_id)
+    
+    points_json = json.dumps(points)
+    group.points_source_id = 0
+    group.points_data = points_json
+    group.points_version += 1
+    group.data_size = len(points_json)
+    group.last_update = time.time()
+    points_cache[get_points_key(props, group.group_id)] = {"version": group.points_version, "points": points, "refs": {group.group_id}}
+
+# Le cache ne survit pas à un chargement ou à une annulation globale
+@persistent
+def clear_points_cache(dummy):
+    points_cache.clear()
+
+# Matérialise les tampons partagés dont le propriétaire n'existe plus avant la sauvegarde
+@persistent
+def materialize_shared_points_on_save(dummy):
+    for scene in bpy.data.scenes:
+        props = scene.random_placement_props
+        for group in props.placement_groups:
+            if not group.points_source_id or find_group(props, group.points_source_id) is not None:
+                continue
+            entry = points_cache.get(get_points_key(props, group.points_source_id))
+            store_group_points(props, group, entry["points"] if entry is not None else [])
+
+# Paramètres d'un groupe enregistrés dans l'historique du plugin
+HISTORY_PARAMS = (
+    "random_seed",
+    "num_instances",
+    "align_to_normal",
+    "max_rotation_x",
+    "max_rotation_y",
+    "max_rotation_z",
+    "scale_min",
+    "scale_max",
+    "uniform_scale",
+    "is_visible",
+    "source_weight",
+)
+HISTORY_LIMIT = 200
+HISTORY_MERGE_DELAY = 0.5
+
+# Historique léger : seules les valeurs modifiées sont conservées, jamais les objets
+placement_history = {
+    "scenes": {},
+    "suspend_updates": False,
+}
+
+# Les identifiants de groupe sont propres à chaque scène : une pile par scène
+def get_scene_history(scene):
+    return placement_history["scenes"].setdefault(scene.name, {"undo": [], "redo": [], "snapshots": {}})
+
+def snapshot_group_params(props, group):
+    snapshot = {name: getattr(group, name) for name in HISTORY_PARAMS}
+    snapshot["variant_weights"] = tuple(item.weight for item in group.extra_sources)
+    
+    # Référence au tampon de points (partagé ou propre), sans copie ni décodage
+    owner = get_points_owner(props, group)
+    entry = points_cache.get(get_points_key(props, owner.group_id))
+    snapshot["points"] = {
+        "source_id": group.points_source_id,
+        "version": owner.points_version,
+        "buffer": entry["points"] if entry is not None and entry["version"] == owner.points_version else None,
+    }
+    return snapshot
+
+# Enregistre les paramètres modifiés d'un groupe depuis la dernière mise à jour
+# Retourne True si le groupe a changé
+def record_group_history(props, history, group):
+    current = snapshot_group_params(props, group)
+    previous = history["snapshots"].get(group.group_id)
+    history["snapshots"][group.group_id] = current
+    
+    if previous is None:
+        return False
+    
+    changed = [name for name in HISTORY_PARAMS if current[name] != previous[name]]
+    
+    # L'ajout ou la suppression de variantes passe par l'annulation de Blender, seuls les poids sont suivis
+    if (len(current["variant_weights"]) == len(previous["variant_weights"])
+            and current["variant_weights"] != previous["variant_weights"]):
+        changed.append("variant_weights")
+    
+    if not changed:
+        return False
+    
+    # Les points ne changent qu'avec le nombre d'instances : l'étape garde les deux tampons
+    if "num_instances" in changed:
+        changed.append("points")
+    
+    now = time.time()
+    undo_stack = history["undo"]
+    last = undo_stack[-1] if undo_stack else None
+    
+    # Fusionne les modifications rapprochées d'un même paramètre (glissement d'un slider)
+    if (last is not None and last["group_id"] == group.group_id
+            and set(last["after"]) == set(changed) and now - last["time"] < HISTORY_MERGE_DELAY):
+        last["after"] = {name: current[name] for name in changed}
+        last["time"] = now
+    else:
+        undo_stack.append({
+            "group_id": group.group_id,
+            "before": {name: previous[name] for name in changed},
+            "after": {name: current[name] for name in changed},
+            "time": now,
+        })
+        del undo_stack[:-HISTORY_LIMIT]
+    
+    history["redo"].clear()
+    group.last_update = now
+    return True
+
+# Réapplique un état enregistré via le chemin de mise à jour habituel
+def apply_history_entry(context, entry, state):
+    props = context.scene.random_placement_props
+    group = find_group(props, entry["group_id"])
+    if group is None:
+        return False
+    
+    placement_history["suspend_updates"] = True
+    try:
+        for name, value in entry[state].items():
+            if name == "points":
+                restore_group_points(props, group, value)
+            elif name == "variant_weights":
+                if len(value) == len(group.extra_sources):
+                    for item, weight in zip(group.extra_sources, value):
+                        item.weight = weight
+            else:
+                setattr(group, name, value)
+    finally:
+        placement_history["suspend_updates"] = False
+    
+    # update_placement ne régénère les points que si aucun tampon n'a pu être restauré
+    group.last_update = time.time()
+    get_scene_history(context.scene)["snapshots"][group.group_id] = snapshot_group_params(props, group)
+    update_placement(props, context)
+    return True
+
+# Remet en place le tampon de points enregistré dans une étape de l'historique
+def restore_group_points(props, group, state):
+    source_id = state["source_id"]
+    if source_id:
+        # Partage de nouveau le tampon du groupe d'origine s'il n'a pas changé depuis
+        owner = find_group(props, source_id)
+        if owner is not None and owner.group_id != group.group_id and owner.points_version == state["version"]:
+            if group.points_source_id != source_id:
+                materialize_dependents(props, group)
+                release_group_points(props, group.group_id)
+                group.points_source_id = source_id
+                group.points_data = ""
+                group.data_size = 0
+            return
+    elif group.points_source_id == 0 and group.points_version == state["version"]:
+        return
+    
+    if state["buffer"] is not None:
+        store_group_points(props, group, state["buffer"])
+
+# Après une annulation de Blender, les instantanés reprennent l'état restauré
+@persistent
+def resync_history_snapshots(dummy):
+    for scene in bpy.data.scenes:
+        history = placement_history["scenes"].get(scene.name)
+        if history is None:
+            continue
+        props = scene.random_placement_props
+        history["snapshots"] = {group.group_id: snapshot_group_params(props, group) for group in props.placement_groups}
+
+def clear_placement_history():
+    placement_history["scenes"].clear()
+
+@persistent
+def clear_placement_history_on_load(dummy):
+    clear_placement_history()
+
+# Une variante doit avoir le même type de données que la source principale
+def is_valid_source_variant(group, obj):
+    return group.source_obj is not None and obj.type == group.source_obj.type and obj != group.target_obj
+
+# Retourne les sources pondérées d'un groupe (source principale puis variantes)
+def get_group_sources(group):
+    sources = []
+    if group.source_obj and group.source_weight > 0:
+        sources.append((group.source_obj, group.source_weight))
+    for item in group.extra_sources:
+        if item.obj and item.weight > 0 and is_valid_source_variant(group, item.obj):
+            sources.append((item.obj, item.weight))
+    if not sources and group.source_obj:
+        sources.append((group.source_obj, 1.0))
+    return sources
+
+# Tire la source de chaque instance selon les poids, à partir du seed du groupe
+def assign_group_sources(group, sources, count):
+    if len(sources) <= 1:
+        return np.zeros(count, dtype=np.intp)
+    cumulative = np.cumsum([weight for _, weight in sources])
+    rng = np.random.default_rng(group.random_seed + 2000)  # Seed différent pour les sources
+    return np.searchsorted(cumulative, rng.random(count) * cumulative[-1], side="right")
+
+# Nom du maillage proxy décimé d'une source pour un taux donné
+def get_proxy_name(source, ratio):
+    return f"{source.data.name}_RPProxy_{ratio:.3f}"
+
+# Retourne le maillage proxy d'une source, généré une seule fois par taux de décimation
+def get_proxy_mesh(source, ratio):
+    if source.type != 'MESH':
+        return source.data
+    
+    proxy = bpy.data.meshes.get(get_proxy_name(source, ratio))
+    if proxy is not None:
+        return proxy
+    
+    # Évalue une copie temporaire de la source avec un modificateur Decimate
+    temp_obj = bpy.data.objects.new("RandomPlacement_ProxyTemp", source.data)
+    bpy.context.scene.collection.objects.link(temp_obj)
+    modifier = temp_obj.modifiers.new("Decimate", 'DECIMATE')
+    modifier.ratio = ratio
+    depsgraph = bpy.context.evaluated_depsgraph_get()
+    depsgraph.update()
+    new_proxy = bpy.data.meshes.new_from_object(temp_obj.evaluated_get(depsgraph))
+    bpy.data.objects.remove(temp_obj, do_unlink=True)
+    
+    # Les proxies d'autres taux restent utilisés par leurs groupes, ou disparaissent sans utilisateur
+    new_proxy.name = get_proxy_name(source, ratio)
+    return new_proxy
+
+# Assigne les données liées de chaque instance selon sa source tirée
+def apply_group_sources(group, group_objects):
+    sources = get_group_sources(group)
+    if not sources:
+        return
+    indices = [obj.get("random_placement_index", i) for i, obj in enumerate(group_objects)]
+    assignment = assign_group_sources(group, sources, max(indices) + 1)
+    source_data = [source.data for source, _ in sources]
+    
+    # Ne modifie que les instances dont la source a changé
+    for obj, index in zip(group_objects, indices):
+        data = source_data[assignment[index]]
+        if obj.data != data:
+            obj.data = data
+
+# Politique d'affichage effective : seuls les groupes au-delà du budget sont allégés
+def get_display_policy(props, group):
+    if group.num_instances > props.display_budget:
+        return group.display_policy
+    return 'FULL'
+
+# Supprime les objets proxy d'un groupe
+def remove_proxy_objects(group):
+    if not group.has_proxies:
+        return
+    proxies = [obj for obj in bpy.data.objects if obj.get("random_placement_proxy_id") == group.group_id]
+    for obj in proxies:
+        bpy.data.objects.remove(obj, do_unlink=True)
+    group.has_proxies = False
+
+# Affiche des objets proxy à la place des instances, uniquement dans le viewport
+def update_proxy_objects(context, group, group_objects):
+    # Les instances gardent toujours la source complète : le rendu et les fichiers enregistrés
+    # (y compris les sauvegardes automatiques) ne dépendent jamais des proxies
+    proxy_data = {source.data: get_proxy_mesh(source, group.proxy_ratio) for source, _ in get_group_sources(group)}
+    proxies = {}
+    if group.has_proxies:
+        for obj in bpy.data.objects:
+            if obj.get("random_placement_proxy_id") == group.group_id:
+                proxies[obj.get("random_placement_index", 0)] = obj
     
-    if not selected_face:
-        selected_face = bm.faces[-1]
-    
-    verts = selected_face.verts
-    if len(verts) == 3:  # Triangle
-        a, b, c = [v.co for v in verts]
-        u = random.random()
-        v = random.random()
-        if u + v > 1:
-            u = 1 - u
-            v = 1 - v
-        w = 1 - u - v
-        point = a * u + b * v + c * w
-    else:  # Polygone (décomposé en triangles)
-        center = selected_face.calc_center_median()
-        i = random.randint(0, len(verts) - 1)
-        a = center
-        b = verts[i].co
-        c = verts[(i + 1) % len(verts)].co
-        
-        u = random.random()
-        v = random.random()
-        if u + v > 1:
-            u = 1 - u
-            v = 1 - v
-        w = 1 - u - v
-        point = a * u + b * v + c * w
-    
-    normal = selected_face.normal
-    
-    bm.free()
-    obj.to_mesh_clear()
-    
-    return point, normal
+    if group.collection_name and group.collection_name in bpy.data.collections:
+        collection = bpy.data.collections[group.collection_name]
+    else:
+        collection = context.scene.collection
+    
+    for i, obj in enumerate(group_objects):
+        index = obj.get("random_placement_index", i)
+        data = proxy_data.get(obj.data, obj.data)
+        proxy = proxies.pop(index, None)
+        if proxy is None:
+            # Le proxy n'est jamais rendu
+            proxy = bpy.data.objects.new(f"{obj.name}_Proxy", data)
+            proxy["random_placement_proxy_id"] = group.group_id
+            proxy["random_placement_index"] = index
+            proxy.hide_render = True
+            collection.objects.link(proxy)
+        elif proxy.data != data:
+            proxy.data = data
+        
+        # Reprend la transformation et la visibilité de l'instance, qui est cachée du viewport
+        proxy.parent = obj.parent
+        proxy.matrix_parent_inverse = obj.matrix_parent_inverse
+        proxy.rotation_mode = obj.rotation_mode
+        proxy.location = obj.location
+        proxy.rotation_euler = obj.rotation_euler
+        proxy.rotation_quaternion = obj.rotation_quaternion
+        proxy.scale = obj.scale
+        proxy.display_type = group.source_obj.display_type
+        proxy.hide_viewport = obj.hide_viewport
+        obj.hide_viewport = True
+    
+    # Supprime les proxies d'instances qui n'existent plus
+    for proxy in proxies.values():
+        bpy.data.objects.remove(proxy, do_unlink=True)
+    group.has_proxies = True
+
+# Applique en bloc la politique d'affichage viewport (le rendu garde la source complète)
+def apply_display_policy(context, props, group, group_objects):
+    policy = get_display_policy(props, group)
+    
+    if policy == 'BOUNDS':
+        display_type = 'BOUNDS'
+    elif policy == 'WIRE':
+        display_type = 'WIRE'
+    else:
+        display_type = group.source_obj.display_type
+    for obj in group_objects:
+        if obj.display_type != display_type:
+            obj.display_type = display_type
+    
+    # N'affiche qu'une fraction déterministe des instances
+    if policy == 'FRACTION':
+        indices = [obj.get("random_placement_index", i) for i, obj in enumerate(group_objects)]
+        rng = np.random.default_rng(group.random_seed + 3000)  # Seed différent pour l'affichage
+        shown = rng.random(max(indices) + 1) < group.display_fraction
+        for obj, index in zip(group_objects, indices):
+            if not obj.hide_viewport and not shown[index]:
+                obj.hide_viewport = True
+    
+    if policy == 'PROXY':
+        update_proxy_objects(context, group, group_objects)
+    else:
+        remove_proxy_objects(group)
 
 # Fonction pour mettre à jour le placement des objets
 def update_placement(self, context):
     props = context.scene.random_placement_props
     
+    # Évite les mises à jour répétées pendant l'historique ou un import
+    if placement_history["suspend_updates"]:
+        return
+    
     # Vérifie si la mise à jour dynamique est activée
     if not props.dynamic_update:
         return
     
+    history = get_scene_history(context.scene)
+    
     # Met à jour chaque groupe de placement
     for group_index, group in enumerate(props.placement_groups):
         # Vérifie si l'objet source existe encore
         if not group.source_obj:
             continue
             
-        # Récupère tous les objets de ce groupe
+        # Récupère tous les objets de ce groupe, dans l'ordre de leur index
         group_objects = [obj for obj in bpy.data.objects if obj.get("random_placement_id") == group.group_id]
+        group_objects.sort(key=lambda obj: obj.get("random_placement_index", 0))
         
         if not group_objects:
             continue
@@ -91,49 +617,48 @@ def update_placement(self, context):
         # Trouve l'objet cible
         target_obj = group.target_obj
         
+        # Groupe importé sans cible : les transformations viennent du fichier
         if not target_obj:
+            for obj in group_objects:
+                obj.hide_viewport = not group.is_visible
+                obj.hide_render = not group.is_visible
+            if group.is_visible:
+                apply_group_sources(group, group_objects)
+                apply_display_policy(context, props, group, group_objects)
+            else:
+                remove_proxy_objects(group)
+            record_group_history(props, history, group)
+            continue
+        
+        # Charge les points et normales stockés (partagés via le cache)
+        try:
+            points_data = load_group_points(props, group)
+        except:
             continue
         
-        # Vérifie si le nombre d'instances a changé
+        # Régénère les points si le nombre d'instances a changé
+        if len(points_data) != group.num_instances:
+            points_data = generate_points_data(target_obj, group.random_seed, group.num_instances)
+            store_group_points(props, group, points_data)
+        
+        # Enregistre les paramètres modifiés (et le tampon de points) dans l'historique du plugin
+        record_group_history(props, history, group)
+        
+        # Ajoute de nouveaux objets si nécessaire (les objets en excès sont cachés plus bas)
         current_num_instances = len(group_objects)
-        if current_num_instances != group.num_instances:
-            # Régénère les points et normales
-            points_data = []
-            for i in range(group.num_instances):
-                point, normal = get_random_point_on_surface(target_obj, seed=group.random_seed + i)
-                points_data.append({"point": [point.x, point.y, point.z], "normal": [normal.x, normal.y, normal.z]})
-            
-            # Met à jour les points stockés
-            group.points_data = json.dumps(points_data)
-            
-            # Ajoute ou supprime des objets si nécessaire
-            if current_num_instances < group.num_instances:
-                # Ajoute de nouveaux objets
-                for i in range(current_num_instances, group.num_instances):
-                    new_obj = group.source_obj.copy()
-                    new_obj.data = group.source_obj.data
-                    new_obj["random_placement_id"] = group.group_id
-                    new_obj["random_placement_index"] = i
-                    
-                    if group.collection_name:
-                        bpy.data.collections[group.collection_name].objects.link(new_obj)
-                    else:
-                        context.scene.collection.objects.link(new_obj)
-                    
-                    group_objects.append(new_obj)
-            else:
-                # Cache les objets en excès
-                for obj in group_objects[group.num_instances:]:
-                    obj.hide_viewport = True
-                    obj.hide_render = True
-        
-        # Charge les points et normales stockés
-        points_data = []
-        if group.points_data:
-            try:
-                points_data = json.loads(group.points_data)
-            except:
-                continue
+        if current_num_instances < group.num_instances:
+            for i in range(current_num_instances, group.num_instances):
+                new_obj = group.source_obj.copy()
+                new_obj.data = group.source_obj.data
+                new_obj["random_placement_id"] = group.group_id
+                new_obj["random_placement_index"] = i
+                
+                if group.collection_name:
+                    bpy.data.collections[group.collection_name].objects.link(new_obj)
+                else:
+                    context.scene.collection.objects.link(new_obj)
+                
+                group_objects.append(new_obj)
         
         # Applique la visibilité du groupe
         for obj in group_objects:
@@ -142,8 +667,12 @@ def update_placement(self, context):
         
         # Si le groupe n'est pas visible, passe au suivant
         if not group.is_visible:
+            remove_proxy_objects(group)
             continue
         
+        # Répartit les instances entre les sources pondérées
+        apply_group_sources(group, group_objects)
+        
         # Mise à jour des objets existants
         for i, obj in enumerate(group_objects):
             if i >= len(points_data):
@@ -200,6 +729,298 @@ def update_placement(self, context):
                     random.uniform(group.scale_min, group.scale_max),
                     random.uniform(group.scale_min, group.scale_max)
                 )
+        
+        # Applique la politique d'affichage viewport du groupe
+        apply_display_policy(context, props, group, group_objects)
+
+# Format binaire d'export des placements (little-endian, versionné)
+EXPORT_MAGIC = b"RPTP"
+EXPORT_VERSION = 1
+EXPORT_HEADER = struct.Struct("<4sHHQI")
+EXPORT_CHUNK_SIZE = 65536
+
+# Un enregistrement par instance : groupe, source, position, rotation (w, x, y, z), échelle
+PLACEMENT_DTYPE = np.dtype([
+    ("group_id", "<u4"),
+    ("source_id", "<u4"),
+    ("position", "<f4", (3,)),
+    ("rotation", "<f4", (4,)),
+    ("scale", "<f4", (3,)),
+])
+
+EXPORT_EXTENSIONS = {
+    'BINARY': ".rpt",
+    'CSV': ".csv",
+    'NPY': ".npy",
+}
+
+# Lit en une fois les matrices monde d'une collection d'objets (ordre des colonnes de Blender)
+def read_matrices(objects):
+    buffer = np.empty(len(objects) * 16, dtype=np.float32)
+    objects.foreach_get("matrix_world", buffer)
+    return buffer.reshape(-1, 4, 4)
+
+# Matrices de tous les objets de la scène et lignes (index, ligne) des instances de chaque groupe
+def read_all_instance_matrices(scene):
+    rows_by_group = {}
+    for row, obj in enumerate(scene.objects):
+        group_id = obj.get("random_placement_id")
+        if group_id is not None:
+            rows_by_group.setdefault(group_id, []).append((obj.get("random_placement_index", 0), row))
+    return read_matrices(scene.objects), rows_by_group
+
+# Décompose des matrices (colonnes de Blender) en positions, quaternions (w, x, y, z) et échelles
+def decompose_matrices(columns):
+    positions = columns[:, 3, :3]
+    basis = columns[:, :3, :3]
+    scales = np.linalg.norm(basis, axis=2)
+    scales[np.linalg.det(basis) < 0, 0] *= -1
+    rotation = np.transpose(basis / np.where(scales == 0, 1, scales)[:, :, None], (0, 2, 1))
+    
+    # Méthode de Shepperd : la branche suit le plus grand terme parmi la trace et la diagonale
+    r = rotation
+    r00, r11, r22 = r[:, 0, 0], r[:, 1, 1], r[:, 2, 2]
+    branch = np.argmax(np.stack((r00 + r11 + r22, r00, r11, r22), axis=1), axis=1)
+    quaternions = np.empty((len(columns), 4), dtype=np.float64)
+    
+    rows = branch == 0
+    s = 2 * np.sqrt(np.maximum(1e-12, 1 + r00[rows] + r11[rows] + r22[rows]))
+    quaternions[rows] = np.stack((0.25 * s,
+                                  (r[rows, 2, 1] - r[rows, 1, 2]) / s,
+                                  (r[rows, 0, 2] - r[rows, 2, 0]) / s,
+                                  (r[rows, 1, 0] - r[rows, 0, 1]) / s), axis=1)
+    rows = branch == 1
+    s = 2 * np.sqrt(np.maximum(1e-12, 1 + r00[rows] - r11[rows] - r22[rows]))
+    quaternions[rows] = np.stack(((r[rows, 2, 1] - r[rows, 1, 2]) / s,
+                                  0.25 * s,
+                                  (r[rows, 0, 1] + r[rows, 1, 0]) / s,
+                                  (r[rows, 0, 2] + r[rows, 2, 0]) / s), axis=1)
+    rows = branch == 2
+    s = 2 * np.sqrt(np.maximum(1e-12, 1 - r00[rows] + r11[rows] - r22[rows]))
+    quaternions[rows] = np.stack(((r[rows, 0, 2] - r[rows, 2, 0]) / s,
+                                  (r[rows, 0, 1] + r[rows, 1, 0]) / s,
+                                  0.25 * s,
+                                  (r[rows, 1, 2] + r[rows, 2, 1]) / s), axis=1)
+    rows = branch == 3
+    s = 2 * np.sqrt(np.maximum(1e-12, 1 - r00[rows] - r11[rows] + r22[rows]))
+    quaternions[rows] = np.stack(((r[rows, 1, 0] - r[rows, 0, 1]) / s,
+                                  (r[rows, 0, 2] + r[rows, 2, 0]) / s,
+                                  (r[rows, 1, 2] + r[rows, 2, 1]) / s,
+                                  0.25 * s), axis=1)
+    
+    # Partie scalaire positive, comme mathutils
+    quaternions[quaternions[:, 0] < 0] *= -1
+    quaternions /= np.linalg.norm(quaternions, axis=1)[:, None]
+    return positions, quaternions.astype(np.float32), scales
+
+# Remplit par blocs un tableau structuré avec les transformations finales des instances
+def iter_placement_chunks(groups, chunk_size=EXPORT_CHUNK_SIZE):
+    buffer = np.zeros(chunk_size, dtype=PLACEMENT_DTYPE)
+    for group, matrices, instance_sources in groups:
+        for start in range(0, len(matrices), chunk_size):
+            positions, rotations, scales = decompose_matrices(matrices[start:start + chunk_size])
+            records = buffer[:len(positions)]
+            records["group_id"] = group.group_id
+            records["source_id"] = instance_sources[start:start + chunk_size]
+            records["position"] = positions
+            records["rotation"] = rotations
+            records["scale"] = scales
+            yield records
+
+# Exporte les placements des groupes vers un fichier binaire, CSV ou NumPy
+def export_placements(props, filepath, file_format='BINARY', chunk_size=EXPORT_CHUNK_SIZE):
+    groups = []
+    source_ids = {}
+    all_matrices = None
+    for group in props.placement_groups:
+        sources = get_group_sources(group)
+        if not sources:
+            continue
+        
+        # Une seule lecture groupée pour tous les groupes, instances triées par index
+        if all_matrices is None:
+            all_matrices, rows_by_group = read_all_instance_matrices(props.id_data)
+        pairs = [(index, row) for index, row in sorted(rows_by_group.get(group.group_id, [])) if index < group.num_instances]
+        if not pairs:
+            continue
+        indices = np.array([index for index, _ in pairs], dtype=np.intp)
+        matrices = all_matrices[[row for _, row in pairs]]
+        
+        # Même tirage pondéré que apply_group_sources, indexé par random_placement_index
+        for source, _ in sources:
+            source_ids.setdefault(source.name, len(source_ids))
+        file_ids = np.array([source_ids[source.name] for source, _ in sources], dtype=np.uint32)
+        assignment = assign_group_sources(group, sources, int(indices.max()) + 1)
+        groups.append((group, matrices, file_ids[assignment[indices]]))
+
+    source_names = list(source_ids)
+    record_count = sum(len(matrices) for _, matrices, _ in groups)
+    chunks = iter_placement_chunks(groups, chunk_size)
+
+    if file_format == 'NPY':
+        # Tableau structuré écrit directement sur disque, noms des sources à côté
+        array = np.lib.format.open_memmap(filepath, mode="w+", dtype=PLACEMENT_DTYPE, shape=(record_count,))
+        offset = 0
+        for records in chunks:
+            array[offset:offset + len(records)] = records
+            offset += len(records)
+        array.flush()
+        del array
+        with open(os.path.splitext(filepath)[0] + ".sources.json", "w", encoding="utf-8") as f:
+            json.dump(source_names, f)
+    elif file_format == 'CSV':
+        with open(filepath, "w", encoding="utf-8", newline="") as f:
+            f.write(f"# sources: {json.dumps(source_names)}\n")
+            f.write("group_id,source_id,px,py,pz,qw,qx,qy,qz,sx,sy,sz\n")
+            for records in chunks:
+                ids = np.column_stack((records["group_id"], records["source_id"]))
+                values = np.hstack((records["position"], records["rotation"], records["scale"]))
+                np.savetxt(f, np.hstack((ids, values)), delimiter=",",
+                           fmt=["%d", "%d"] + ["%.7g"] * values.shape[1])
+    else:
+        with open(filepath, "wb") as f:
+            f.write(EXPORT_HEADER.pack(EXPORT_MAGIC, EXPORT_VERSION, 0, record_count, len(source_names)))
+            for name in source_names:
+                encoded = name.encode("utf-8")
+                f.write(struct.pack("<H", len(encoded)))
+                f.write(encoded)
+            for records in chunks:
+                records.tofile(f)
+
+    return record_count
+
+# Lit l'en-tête d'un fichier binaire de placements
+def read_placement_header(f):
+    data = f.read(EXPORT_HEADER.size)
+    if len(data) != EXPORT_HEADER.size:
+        raise ValueError("File is too short to be a placement export")
+    magic, version, _flags, record_count, source_count = EXPORT_HEADER.unpack(data)
+    if magic != EXPORT_MAGIC:
+        raise ValueError("Not a Random Placement export file")
+    if version > EXPORT_VERSION:
+        raise ValueError(f"Unsupported placement export version {version}")
+    source_names = []
+    for _ in range(source_count):
+        (length,) = struct.unpack("<H", f.read(2))
+        source_names.append(f.read(length).decode("utf-8"))
+    return record_count, source_names
+
+# Reconstruit des groupes de placement à partir d'un fichier binaire exporté
+def import_placements(context, filepath, chunk_size=EXPORT_CHUNK_SIZE):
+    props = context.scene.random_placement_props
+    # Index des groupes créés : ajouter un élément réalloue la collection, les références deviennent invalides
+    created_groups = {}
+    points_by_group = {}
+    skipped = 0
+
+    placement_history["suspend_updates"] = True
+    try:
+        with open(filepath, "rb") as f:
+            record_count, source_names = read_placement_header(f)
+            sources = [bpy.data.objects.get(name) for name in source_names]
+            remaining = record_count
+            while remaining > 0:
+                records = np.fromfile(f, dtype=PLACEMENT_DTYPE, count=min(chunk_size, remaining))
+                if len(records) == 0:
+                    break
+                remaining -= len(records)
+
+                for record in records:
+                    source_obj = sources[record["source_id"]] if record["source_id"] < len(sources) else None
+                    if source_obj is None:
+                        skipped += 1
+                        continue
+
+                    # Un groupe importé par groupe et source du fichier : chaque groupe garde une seule source
+                    file_group_id = (int(record["group_id"]), int(record["source_id"]))
+                    group_index = created_groups.get(file_group_id)
+                    if group_index is None:
+                        # Groupe importé sans cible : seules sa visibilité et son affichage sont mis à jour
+                        group = props.placement_groups.add()
+                        group.group_id = props.next_group_id
+                        props.next_group_id += 1
+                        group.source_obj = source_obj
+                        group.is_visible = True
+                        if props.use_collection:
+                            collection_name = f"RandomPlacement_{source_obj.name}_import{group.group_id}"
+                            collection = bpy.data.collections.new(collection_name)
+                            context.scene.collection.children.link(collection)
+                            group.collection_name = collection.name
+                        group_index = len(props.placement_groups) - 1
+                        created_groups[file_group_id] = group_index
+                        points_by_group[file_group_id] = []
+                    group = props.placement_groups[group_index]
+
+                    points_data = points_by_group[file_group_id]
+                    rotation = Quaternion(record["rotation"])
+
+                    new_obj = source_obj.copy()
+                    new_obj.data = source_obj.data
+                    new_obj["random_placement_id"] = group.group_id
+                    new_obj["random_placement_index"] = len(points_data)
+                    new_obj.location = record["position"]
+                    new_obj.scale = record["scale"]
+
+                    # Respecte le mode de rotation hérité de la source
+                    if new_obj.rotation_mode == 'QUATERNION':
+                        new_obj.rotation_quaternion = rotation
+                    elif new_obj.rotation_mode == 'AXIS_ANGLE':
+                        axis, angle = rotation.to_axis_angle()
+                        new_obj.rotation_axis_angle = (angle, axis.x, axis.y, axis.z)
+                    else:
+                        new_obj.rotation_euler = rotation.to_euler(new_obj.rotation_mode)
+
+                    if group.collection_name:
+                        bpy.data.collections[group.collection_name].objects.link(new_obj)
+                    else:
+                        context.scene.collection.objects.link(new_obj)
+
+                    normal = rotation @ Vector((0, 0, 1))
+                    points_data.append({"point": [float(c) for c in record["position"]],
+                                        "normal": [normal.x, normal.y, normal.z]})
+
+        for file_group_id, group_index in created_groups.items():
+            group = props.placement_groups[group_index]
+            points_data = points_by_group[file_group_id]
+            group.num_instances = len(points_data)
+            store_group_points(props, group, points_data)
+    finally:
+        placement_history["suspend_updates"] = False
+
+    if created_groups:
+        props.active_group_index = len(props.placement_groups) - 1
+
+    # Une seule mise à jour pour tous les groupes importés
+    update_placement(props, context)
+
+    return len(created_groups), record_count - skipped
+
+# Formate une taille en octets pour l'affichage
+def format_size(num_bytes):
+    for unit in ("B", "KB", "MB"):
+        if num_bytes < 1024:
+            return f"{num_bytes:.0f} {unit}" if unit == "B" else f"{num_bytes:.1f} {unit}"
+        num_bytes /= 1024
+    return f"{num_bytes:.1f} GB"
+
+# Limite le choix d'une variante aux objets compatibles avec la source du groupe
+def poll_source_variant(self, obj):
+    group_path = self.path_from_id().rsplit(".extra_sources", 1)[0]
+    group = self.id_data.path_resolve(group_path)
+    return is_valid_source_variant(group, obj)
+
+# Variante pondérée de l'objet source d'un groupe
+class PlacementSourceItem(bpy.types.PropertyGroup):
+    obj: bpy.props.PointerProperty(type=bpy.types.Object, poll=poll_source_variant)
+    
+    weight: bpy.props.FloatProperty(
+        name="Weight",
+        description="Relative probability of this source",
+        default=1.0,
+        min=0.0,
+        soft_max=10.0,
+        update=update_placement
+    )
 
 # Structure pour stocker les paramètres d'un groupe de placement
 class PlacementGroupSettings(bpy.types.PropertyGroup):
@@ -271,19 +1092,35 @@ class PlacementGroupSettings(bpy.types.PropertyGroup):
     source_obj: bpy.props.PointerProperty(type=bpy.types.Object)
     target_obj: bpy.props.PointerProperty(type=bpy.types.Object)
     
+    # Poids de la source principale et variantes supplémentaires
+    source_weight: bpy.props.FloatProperty(
+        name="Weight",
+        description="Relative probability of the main source",
+        default=1.0,
+        min=0.0,
+        soft_max=10.0,
+        update=update_placement
+    )
+    extra_sources: bpy.props.CollectionProperty(type=PlacementSourceItem)
+    
     # Propriétés de placement
     num_instances: bpy.props.IntProperty(
         name="Number of Instances",
         description="Number of instances to create",
         default=10,
         min=1,
-        max=1000,
+        soft_max=1000,
+        max=1000000,
         update=update_placement
     )
     
     # Stockage des points et normales
     points_data: bpy.props.StringProperty(default="")
     
+    # Groupe dont le tampon de points est partagé (0 : tampon propre)
+    points_source_id: bpy.props.IntProperty(default=0)
+    points_version: bpy.props.IntProperty(default=0)
+    
     # Nom de la collection
     collection_name: bpy.props.StringProperty(default="")
     
@@ -292,6 +1129,48 @@ class PlacementGroupSettings(bpy.types.PropertyGroup):
     
     # Seed pour la génération aléatoire
     random_seed: bpy.props.IntProperty(default=0)
+    
+    # Politique d'affichage viewport au-delà du budget d'instances
+    display_policy: bpy.props.EnumProperty(
+        name="Display",
+        description="Viewport display used when the group exceeds the instance budget",
+        items=[
+            ('FULL', "Full", "Display instances like the source object"),
+            ('BOUNDS', "Bounds", "Display instances as bounding boxes"),
+            ('WIRE', "Wire", "Display instances as wireframes"),
+            ('PROXY', "Proxy", "Display decimated proxy objects in the viewport only, renders use the full instances"),
+            ('FRACTION', "Fraction", "Display only a deterministic fraction of the instances"),
+        ],
+        default='BOUNDS',
+        update=update_placement
+    )
+    
+    display_fraction: bpy.props.FloatProperty(
+        name="Displayed Fraction",
+        description="Fraction of the instances shown in the viewport",
+        default=0.25,
+        min=0.0,
+        max=1.0,
+        subtype='FACTOR',
+        update=update_placement
+    )
+    
+    proxy_ratio: bpy.props.FloatProperty(
+        name="Proxy Ratio",
+        description="Decimation ratio of the proxy mesh",
+        default=0.1,
+        min=0.01,
+        max=1.0,
+        subtype='FACTOR',
+        update=update_placement
+    )
+    
+    # Des objets proxy de viewport existent pour ce groupe
+    has_proxies: bpy.props.BoolProperty(default=False)
+    
+    # Résumé mis en cache pour le panneau (taille des données, dernière mise à jour)
+    data_size: bpy.props.IntProperty(default=0)
+    last_update: bpy.props.FloatProperty(default=0.0)
 
 # Classe pour stocker les propriétés globales
 class RandomPlacementProperties(bpy.types.PropertyGroup):
@@ -325,6 +1204,30 @@ class RandomPlacementProperties(bpy.types.PropertyGroup):
         max=1000
     )
     
+    # Budget d'instances au-delà duquel un groupe est allégé dans le viewport
+    display_budget: bpy.props.IntProperty(
+        name="Instance Budget",
+        description="Groups with more instances use their viewport display policy",
+        default=500,
+        min=0,
+        update=update_placement
+    )
+    
+    # Cache disque des surfaces préparées pour l'échantillonnage
+    use_sampler_cache: bpy.props.BoolProperty(
+        name="Cache Surfaces on Disk",
+        description="Keep prepared target surfaces in a local cache to skip re-triangulation",
+        default=True
+    )
+    
+    sampler_cache_size: bpy.props.IntProperty(
+        name="Cache Size (MB)",
+        description="Maximum size of the surface cache, oldest entries are removed first",
+        default=1024,
+        min=16,
+        soft_max=16384
+    )
+    
     # Propriétés pour stocker temporairement les objets source et cible
     source_obj: bpy.props.PointerProperty(type=bpy.types.Object)
     target_obj: bpy.props.PointerProperty(type=bpy.types.Object)
@@ -402,14 +1305,8 @@ class RandomLinkedPlacementOperator(bpy.types.Operator):
             bpy.context.scene.collection.children.link(new_collection)
             new_group.collection_name = collection_name
         
-        # Génère et stocke les points et normales
-        points_data = []
-        for i in range(new_group.num_instances):
-            point, normal = get_random_point_on_surface(target_obj, seed=new_group.random_seed + i)
-            points_data.append({"point": [point.x, point.y, point.z], "normal": [normal.x, normal.y, normal.z]})
-        
-        # Stocke les points et normales au format JSON
-        new_group.points_data = json.dumps(points_data)
+        # Génère et stocke les points et normales au format JSON
+        store_group_points(props, new_group, generate_points_data(target_obj, new_group.random_seed, new_group.num_instances))
         
         # Crée les duplications liées
         created_objects = []
@@ -461,7 +1358,7 @@ class ClearRandomPlacementOperator(bpy.types.Operator):
         
         # Supprime les objets existants créés par ce script
         for obj in bpy.data.objects:
-            if obj.get("random_placement_id") is not None:
+            if obj.get("random_placement_id") is not None or obj.get("random_placement_proxy_id") is not None:
                 bpy.data.objects.remove(obj, do_unlink=True)
         
         # Supprime les collections existantes créées par ce script
@@ -475,6 +1372,8 @@ class ClearRandomPlacementOperator(bpy.types.Operator):
         props.placement_groups.clear()
         props.active_group_index = 0
         props.next_group_id = 1
+        placement_history["scenes"].pop(context.scene.name, None)
+        clear_scene_points(props)
         
         self.report({'INFO'}, "Cleared all random placement objects")
         return {'FINISHED'}
@@ -507,13 +1406,19 @@ class RemoveGroupOperator(bpy.types.Operator):
         
         for obj in objects_to_remove:
             bpy.data.objects.remove(obj, do_unlink=True)
+        remove_proxy_objects(group)
         
         # Supprime la collection associée si elle existe
         if group.collection_name:
             if group.collection_name in bpy.data.collections:
                 bpy.data.collections.remove(bpy.data.collections[group.collection_name])
         
+        # Transmet le tampon de points aux groupes qui le partagent
+        materialize_dependents(props, group)
+        release_group_points(props, group_id)
+        
         # Supprime le groupe
+        get_scene_history(context.scene)["snapshots"].pop(group_id, None)
         props.placement_groups.remove(self.group_index)
         
         # Ajuste l'index actif
@@ -546,6 +1451,11 @@ class DuplicateGroupOperator(bpy.types.Operator):
             self.report({'ERROR'}, "Source object no longer exists")
             return {'CANCELLED'}
         
+        # Sans cible, les copies ne pourraient pas être placées
+        if not source_group.target_obj:
+            self.report({'ERROR'}, "Imported groups without a target surface cannot be duplicated")
+            return {'CANCELLED'}
+        
         # Crée un nouveau groupe
         new_group = props.placement_groups.add()
         new_group.group_id = props.next_group_id
@@ -563,18 +1473,21 @@ class DuplicateGroupOperator(bpy.types.Operator):
         new_group.scale_max = source_group.scale_max
         new_group.uniform_scale = source_group.uniform_scale
         new_group.is_visible = source_group.is_visible
+        new_group.source_weight = source_group.source_weight
+        for source_item in source_group.extra_sources:
+            new_item = new_group.extra_sources.add()
+            new_item.obj = source_item.obj
+            new_item.weight = source_item.weight
         
         # Génère un nouveau seed
         new_group.random_seed = random.randint(0, 1000000)
         
-        # Charge les points et normales du groupe source
-        points_data = []
-        if source_group.points_data:
-            try:
-                points_data = json.loads(source_group.points_data)
-            except:
-                self.report({'ERROR'}, "Could not parse source group data")
-                return {'CANCELLED'}
+        # Charge les points et normales du groupe source (décodés une seule fois)
+        try:
+            points_data = load_group_points(props, source_group)
+        except:
+            self.report({'ERROR'}, "Could not parse source group data")
+            return {'CANCELLED'}
         
         # Crée une nouvelle collection
         collection_name = f"RandomPlacement_{source_group.source_obj.name}_{new_group.random_seed}"
@@ -583,8 +1496,10 @@ class DuplicateGroupOperator(bpy.types.Operator):
             bpy.context.scene.collection.children.link(new_collection)
             new_group.collection_name = collection_name
         
-        # Stocke les points et normales
-        new_group.points_data = source_group.points_data
+        # Référence le tampon de points du groupe source jusqu'à sa première modification
+        owner = get_points_owner(props, source_group)
+        new_group.points_source_id = owner.group_id
+        load_group_points(props, new_group)
         
         # Crée les duplications liées
         created_objects = []
@@ -631,7 +1546,8 @@ class ToggleGroupVisibilityOperator(bpy.types.Operator):
     """Toggle visibility of a placement group"""
     bl_idname = "object.toggle_group_visibility"
     bl_label = "Toggle Visibility"
-    bl_options = {'REGISTER', 'UNDO'}
+    # Enregistré dans l'historique du plugin plutôt qu'une étape d'annulation globale
+    bl_options = {'REGISTER'}
     
     group_index: bpy.props.IntProperty()
     
@@ -656,7 +1572,8 @@ class RegenerateGroupOperator(bpy.types.Operator):
     """Regenerate placement with a new random seed"""
     bl_idname = "object.regenerate_placement"
     bl_label = "Regenerate"
-    bl_options = {'REGISTER', 'UNDO'}
+    # Enregistré dans l'historique du plugin plutôt qu'une étape d'annulation globale
+    bl_options = {'REGISTER'}
     
     group_index: bpy.props.IntProperty()
     
@@ -673,6 +1590,10 @@ class RegenerateGroupOperator(bpy.types.Operator):
             self.report({'ERROR'}, "Source object no longer exists")
             return {'CANCELLED'}
         
+        if not group.target_obj:
+            self.report({'ERROR'}, "Imported groups without a target surface cannot be regenerated")
+            return {'CANCELLED'}
+        
         # Génère un nouveau seed
         group.random_seed = random.randint(0, 1000000)
         
@@ -682,6 +1603,261 @@ class RegenerateGroupOperator(bpy.types.Operator):
         self.report({'INFO'}, f"Regenerated placement for group {group.group_id}")
         return {'FINISHED'}
 
+# Opérateur pour ajouter l'objet actif comme variante d'un groupe
+class AddGroupSourceOperator(bpy.types.Operator):
+    """Add the active object as a weighted source variant of a group"""
+    bl_idname = "object.add_placement_source"
+    bl_label = "Add Source Variant"
+    bl_options = {'REGISTER', 'UNDO'}
+    
+    group_index: bpy.props.IntProperty()
+    
+    def execute(self, context):
+        props = context.scene.random_placement_props
+        
+        if self.group_index >= len(props.placement_groups):
+            self.report({'ERROR'}, "Invalid group index")
+            return {'CANCELLED'}
+        
+        group = props.placement_groups[self.group_index]
+        new_source = context.active_object
+        
+        if not group.source_obj or not new_source:
+            self.report({'ERROR'}, "No active object to add")
+            return {'CANCELLED'}
+        
+        # Les données liées doivent être du même type que la source principale
+        if not is_valid_source_variant(group, new_source):
+            self.report({'ERROR'}, f"Source variant must be a {group.source_obj.type.lower()} object")
+            return {'CANCELLED'}
+        
+        if new_source == group.source_obj or any(item.obj == new_source for item in group.extra_sources):
+            self.report({'WARNING'}, f"{new_source.name} is already a source of this group")
+            return {'CANCELLED'}
+        
+        item = group.extra_sources.add()
+        item.obj = new_source
+        item.weight = 1.0
+        
+        update_placement(props, context)
+        return {'FINISHED'}
+
+# Opérateur pour retirer une variante d'un groupe
+class RemoveGroupSourceOperator(bpy.types.Operator):
+    """Remove a source variant from a group"""
+    bl_idname = "object.remove_placement_source"
+    bl_label = "Remove Source Variant"
+    bl_options = {'REGISTER', 'UNDO'}
+    
+    group_index: bpy.props.IntProperty()
+    source_index: bpy.props.IntProperty()
+    
+    def execute(self, context):
+        props = context.scene.random_placement_props
+        
+        if self.group_index >= len(props.placement_groups):
+            self.report({'ERROR'}, "Invalid group index")
+            return {'CANCELLED'}
+        
+        group = props.placement_groups[self.group_index]
+        
+        if self.source_index >= len(group.extra_sources):
+            self.report({'ERROR'}, "Invalid source index")
+            return {'CANCELLED'}
+        
+        group.extra_sources.remove(self.source_index)
+        
+        update_placement(props, context)
+        return {'FINISHED'}
+
+# Opérateur pour annuler la dernière modification de paramètres
+class UndoPlacementOperator(bpy.types.Operator):
+    """Undo the last placement parameter change"""
+    bl_idname = "object.undo_placement"
+    bl_label = "Undo Placement"
+    bl_options = {'REGISTER'}
+    
+    @classmethod
+    def poll(cls, context):
+        return len(get_scene_history(context.scene)["undo"]) > 0
+    
+    def execute(self, context):
+        history = get_scene_history(context.scene)
+        entry = history["undo"].pop()
+        if not apply_history_entry(context, entry, "before"):
+            self.report({'WARNING'}, f"Group {entry['group_id']} no longer exists")
+            return {'CANCELLED'}
+        
+        history["redo"].append(entry)
+        return {'FINISHED'}
+
+# Opérateur pour rétablir une modification annulée
+class RedoPlacementOperator(bpy.types.Operator):
+    """Redo the last undone placement parameter change"""
+    bl_idname = "object.redo_placement"
+    bl_label = "Redo Placement"
+    bl_options = {'REGISTER'}
+    
+    @classmethod
+    def poll(cls, context):
+        return len(get_scene_history(context.scene)["redo"]) > 0
+    
+    def execute(self, context):
+        history = get_scene_history(context.scene)
+        entry = history["redo"].pop()
+        if not apply_history_entry(context, entry, "after"):
+            self.report({'WARNING'}, f"Group {entry['group_id']} no longer exists")
+            return {'CANCELLED'}
+        
+        history["undo"].append(entry)
+        return {'FINISHED'}
+
+# Opérateur pour exporter les placements vers un moteur de jeu
+class ExportPlacementsOperator(bpy.types.Operator, ExportHelper):
+    """Export the final transforms of all placement groups"""
+    bl_idname = "object.export_random_placement"
+    bl_label = "Export Placements"
+
+    filename_ext = ".rpt"
+    filter_glob: bpy.props.StringProperty(default="*.rpt;*.csv;*.npy", options={'HIDDEN'})
+
+    file_format: bpy.props.EnumProperty(
+        name="Format",
+        description="File format of the exported placements",
+        items=[
+            ('BINARY', "Binary", "Versioned little-endian binary file"),
+            ('CSV', "CSV", "Comma separated text file"),
+            ('NPY', "NumPy", "NumPy structured array (.npy)"),
+        ],
+        default='BINARY'
+    )
+
+    def execute(self, context):
+        props = context.scene.random_placement_props
+
+        # Ajuste l'extension au format choisi
+        filepath = os.path.splitext(self.filepath)[0] + EXPORT_EXTENSIONS[self.file_format]
+
+        try:
+            count = export_placements(props, filepath, self.file_format)
+        except OSError as e:
+            self.report({'ERROR'}, f"Could not write placements: {e}")
+            return {'CANCELLED'}
+
+        self.report({'INFO'}, f"Exported {count} placements to {filepath}")
+        return {'FINISHED'}
+
+# Opérateur pour importer des placements exportés
+class ImportPlacementsOperator(bpy.types.Operator, ImportHelper):
+    """Rebuild placement groups from an exported binary file"""
+    bl_idname = "object.import_random_placement"
+    bl_label = "Import Placements"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    filename_ext = ".rpt"
+    filter_glob: bpy.props.StringProperty(default="*.rpt", options={'HIDDEN'})
+
+    def execute(self, context):
+        try:
+            num_groups, num_placements = import_placements(context, self.filepath)
+        except (OSError, ValueError) as e:
+            self.report({'ERROR'}, f"Could not read placements: {e}")
+            return {'CANCELLED'}
+
+        self.report({'INFO'}, f"Imported {num_placements} placements in {num_groups} groups")
+        return {'FINISHED'}
+
+# Liste des groupes de placement avec filtrage et tri
+class PlacementGroupList(bpy.types.UIList):
+    """List of placement groups"""
+    bl_idname = "OBJECT_UL_random_placement_groups"
+    
+    filter_field: bpy.props.EnumProperty(
+        name="Filter By",
+        description="Object name used by the text filter",
+        items=[
+            ('SOURCE', "Source", "Filter groups by source object name"),
+            ('TARGET', "Target", "Filter groups by target object name"),
+        ],
+        default='SOURCE'
+    )
+    
+    visibility_filter: bpy.props.EnumProperty(
+        name="Visibility",
+        description="Show groups according to their visibility",
+        items=[
+            ('ALL', "All", "Show all groups"),
+            ('VISIBLE', "Visible", "Show only visible groups"),
+            ('HIDDEN', "Hidden", "Show only hidden groups"),
+        ],
+        default='ALL'
+    )
+    
+    sort_by: bpy.props.EnumProperty(
+        name="Sort By",
+        description="Order of the groups in the list",
+        items=[
+            ('NONE', "Creation", "Keep creation order"),
+            ('SOURCE', "Source", "Sort by source object name"),
+            ('TARGET', "Target", "Sort by target object name"),
+            ('VISIBILITY', "Visibility", "Show visible groups first"),
+        ],
+        default='NONE'
+    )
+    
+    def draw_item(self, context, layout, data, item, icon, active_data, active_propname, index):
+        source_name = item.source_obj.name if item.source_obj else "<Missing>"
+        row = layout.row(align=True)
+        row.label(text=f"Group {item.group_id}: {source_name} ({item.num_instances})", icon='OUTLINER_OB_EMPTY')
+        
+        vis_icon = 'HIDE_OFF' if item.is_visible else 'HIDE_ON'
+        op = row.operator("object.toggle_group_visibility", text="", icon=vis_icon, emboss=False)
+        op.group_index = index
+    
+    def draw_filter(self, context, layout):
+        row = layout.row(align=True)
+        row.prop(self, "filter_name", text="")
+        row.prop(self, "filter_field", text="")
+        row = layout.row(align=True)
+        row.prop(self, "visibility_filter", text="")
+        row.prop(self, "sort_by", text="")
+    
+    def filter_items(self, context, data, propname):
+        # Sans filtre ni tri, aucun parcours des groupes n'est nécessaire
+        if not self.filter_name and self.visibility_filter == 'ALL' and self.sort_by == 'NONE':
+            return [], []
+        
+        groups = getattr(data, propname)
+        
+        def object_name(group, field):
+            obj = group.source_obj if field == 'SOURCE' else group.target_obj
+            return obj.name if obj else ""
+        
+        flt_flags = [self.bitflag_filter_item] * len(groups)
+        pattern = self.filter_name.lower()
+        for i, group in enumerate(groups):
+            if pattern and pattern not in object_name(group, self.filter_field).lower():
+                flt_flags[i] = 0
+            elif self.visibility_filter == 'VISIBLE' and not group.is_visible:
+                flt_flags[i] = 0
+            elif self.visibility_filter == 'HIDDEN' and group.is_visible:
+                flt_flags[i] = 0
+        
+        flt_neworder = []
+        if self.sort_by == 'VISIBILITY':
+            keys = [(not group.is_visible, i) for i, group in enumerate(groups)]
+        elif self.sort_by != 'NONE':
+            keys = [(object_name(group, self.sort_by).lower(), i) for i, group in enumerate(groups)]
+        else:
+            keys = None
+        if keys is not None:
+            order = sorted(range(len(groups)), key=lambda i: keys[i])
+            flt_neworder = [0] * len(groups)
+            for new_index, old_index in enumerate(order):
+                flt_neworder[old_index] = new_index
+        
+        return flt_flags, flt_neworder
+
 # Panneau pour afficher les propriétés
 class RandomPlacementPanel(bpy.types.Panel):
     """Panel for Random Placement"""
@@ -706,6 +1882,12 @@ class RandomPlacementPanel(bpy.types.Panel):
         box.prop(props, "use_collection")
         box.prop(props, "preserve_previous")
         box.prop(props, "dynamic_update")
+        box.prop(props, "display_budget")
+        row = box.row(align=True)
+        row.prop(props, "use_sampler_cache")
+        sub = row.row(align=True)
+        sub.active = props.use_sampler_cache
+        sub.prop(props, "sampler_cache_size", text="MB")
         
         # Bouton pour exécuter le placement
         row = box.row()
@@ -716,66 +1898,120 @@ class RandomPlacementPanel(bpy.types.Panel):
         row = box.row()
         row.operator("object.clear_random_placement", text="Clear All Placements", icon='TRASH')
         
+        # Boutons d'export et d'import
+        row = box.row(align=True)
+        row.operator("object.export_random_placement", text="Export", icon='EXPORT')
+        row.operator("object.import_random_placement", text="Import", icon='IMPORT')
+        
         # Affichage des groupes de placement
         if len(props.placement_groups) > 0:
             box = layout.box()
             box.label(text="Placement Groups", icon='OUTLINER_OB_GROUP_INSTANCE')
             
-            # Liste des groupes
-            for i, group in enumerate(props.placement_groups):
-                # Cadre pour chaque groupe
-                group_box = box.box()
-                
-                # En-tête du groupe avec boutons d'action
-                header_row = group_box.row()
-                
-                # Nom du groupe et source
-                source_name = group.source_obj.name if group.source_obj else "<Missing>"
-                header_row.label(text=f"Group {group.group_id}: {source_name} ({group.num_instances})", icon='OUTLINER_OB_EMPTY')
-                
-                # Boutons d'action
-                action_row = header_row.row(align=True)
-                action_row.alignment = 'RIGHT'
-                
-                # Bouton de visibilité
-                vis_icon = 'HIDE_OFF' if group.is_visible else 'HIDE_ON'
-                op = action_row.operator("object.toggle_group_visibility", text="", icon=vis_icon)
+            # Historique des paramètres
+            history = get_scene_history(context.scene)
+            row = box.row(align=True)
+            row.operator("object.undo_placement", text=f"Undo ({len(history['undo'])})", icon='LOOP_BACK')
+            row.operator("object.redo_placement", text=f"Redo ({len(history['redo'])})", icon='LOOP_FORWARDS')
+            
+            # Liste des groupes (seules les lignes visibles sont dessinées)
+            box.template_list("OBJECT_UL_random_placement_groups", "", props, "placement_groups",
+                              props, "active_group_index", rows=5)
+            
+            if props.active_group_index >= len(props.placement_groups):
+                return
+            
+            i = props.active_group_index
+            group = props.placement_groups[i]
+            group_box = box.box()
+            
+            # En-tête du groupe actif avec boutons d'action
+            header_row = group_box.row()
+            source_name = group.source_obj.name if group.source_obj else "<Missing>"
+            header_row.label(text=f"Group {group.group_id}: {source_name}", icon='OUTLINER_OB_EMPTY')
+            
+            action_row = header_row.row(align=True)
+            action_row.alignment = 'RIGHT'
+            
+            # Bouton de visibilité
+            vis_icon = 'HIDE_OFF' if group.is_visible else 'HIDE_ON'
+            op = action_row.operator("object.toggle_group_visibility", text="", icon=vis_icon)
+            op.group_index = i
+            
+            # Bouton pour régénérer
+            op = action_row.operator("object.regenerate_placement", text="", icon='FILE_REFRESH')
+            op.group_index = i
+            
+            # Bouton pour dupliquer
+            op = action_row.operator("object.duplicate_placement_group", text="", icon='DUPLICATE')
+            op.group_index = i
+            
+            # Bouton pour supprimer
+            op = action_row.operator("object.remove_placement_group", text="", icon='X')
+            op.group_index = i
+            
+            # Résumé mis en cache du groupe actif
+            last_update = time.strftime("%H:%M:%S", time.localtime(group.last_update)) if group.last_update else "Never"
+            summary_row = group_box.row()
+            summary_row.label(text=f"{group.num_instances} instances")
+            if group.points_source_id:
+                summary_row.label(text=f"Shared with group {group.points_source_id}")
+            else:
+                summary_row.label(text=format_size(group.data_size))
+            summary_row.label(text=f"Updated {last_update}")
+            
+            # Paramètres du groupe actif
+            if group.is_visible:
+                # Sources pondérées
+                source_box = group_box.box()
+                source_box.label(text="Sources", icon='OUTLINER_OB_MESH')
+                row = source_box.row()
+                row.label(text=source_name)
+                row.prop(group, "source_weight", text="")
+                for j, item in enumerate(group.extra_sources):
+                    row = source_box.row(align=True)
+                    row.prop(item, "obj", text="")
+                    row.prop(item, "weight", text="")
+                    op = row.operator("object.remove_placement_source", text="", icon='X')
+                    op.group_index = i
+                    op.source_index = j
+                op = source_box.operator("object.add_placement_source", text="Add Active as Variant", icon='ADD')
                 op.group_index = i
                 
-                # Bouton pour régénérer
-                op = action_row.operator("object.regenerate_placement", text="", icon='FILE_REFRESH')
-                op.group_index = i
+                # Paramètres de rotation
+                rot_box = group_box.box()
+                rot_box.label(text="Rotation Settings", icon='DRIVER_ROTATIONAL_DIFFERENCE')
+                rot_box.prop(group, "align_to_normal")
+                if not group.align_to_normal:
+                    rot_box.prop(group, "max_rotation_x")
+                    rot_box.prop(group, "max_rotation_y")
+                rot_box.prop(group, "max_rotation_z")
                 
-                # Bouton pour dupliquer
-                op = action_row.operator("object.duplicate_placement_group", text="", icon='DUPLICATE')
-                op.group_index = i
+                # Paramètres d'échelle
+                scale_box = group_box.box()
+                scale_box.label(text="Scale Settings", icon='FULLSCREEN_ENTER')
+                scale_box.prop(group, "uniform_scale")
+                scale_box.prop(group, "scale_min")
+                scale_box.prop(group, "scale_max")
                 
-                # Bouton pour supprimer
-                op = action_row.operator("object.remove_placement_group", text="", icon='X')
-                op.group_index = i
+                # Paramètres d'affichage viewport
+                display_box = group_box.box()
+                display_box.label(text="Viewport Display", icon='RESTRICT_VIEW_OFF')
+                display_box.prop(group, "display_policy")
+                if group.display_policy == 'FRACTION':
+                    display_box.prop(group, "display_fraction")
+                elif group.display_policy == 'PROXY':
+                    display_box.prop(group, "proxy_ratio")
+                if group.display_policy != 'FULL':
+                    if get_display_policy(props, group) == 'FULL':
+                        display_box.label(text=f"Inactive (budget {props.display_budget})", icon='INFO')
+                    else:
+                        display_box.label(text=f"Active ({group.num_instances} > {props.display_budget})", icon='INFO')
                 
-                # Si c'est le groupe actif, affiche ses paramètres
-                if i == props.active_group_index and group.is_visible:
-                    # Paramètres de rotation
-                    rot_box = group_box.box()
-                    rot_box.label(text="Rotation Settings", icon='DRIVER_ROTATIONAL_DIFFERENCE')
-                    rot_box.prop(group, "align_to_normal")
-                    if not group.align_to_normal:
-                        rot_box.prop(group, "max_rotation_x")
-                        rot_box.prop(group, "max_rotation_y")
-                    rot_box.prop(group, "max_rotation_z")
-                    
-                    # Paramètres d'échelle
-                    scale_box = group_box.box()
-                    scale_box.label(text="Scale Settings", icon='FULLSCREEN_ENTER')
-                    scale_box.prop(group, "uniform_scale")
-                    scale_box.prop(group, "scale_min")
-                    scale_box.prop(group, "scale_max")
-                    
-                    # Bouton pour appliquer les modifications
-                    apply_row = group_box.row()
-                    apply_row.scale_y = 1.2
-                    apply_row.operator("object.update_placement", text="Apply Changes", icon='CHECKMARK')
+                # Bouton pour appliquer les modifications
+                apply_row = group_box.row()
+                apply_row.scale_y = 1.2
+                apply_row.operator("object.update_placement", text="Apply Changes", icon='CHECKMARK')
 
 # Opérateur pour mettre à jour le placement
 class UpdatePlacementOperator(bpy.types.Operator):
@@ -791,6 +2027,7 @@ class UpdatePlacementOperator(bpy.types.Operator):
 
 # Enregistrement des classes
 classes = (
+    PlacementSourceItem,
     PlacementGroupSettings,
     RandomPlacementProperties,
     RandomLinkedPlacementOperator,
@@ -799,7 +2036,14 @@ classes = (
     DuplicateGroupOperator,
     ToggleGroupVisibilityOperator,
     RegenerateGroupOperator,
+    AddGroupSourceOperator,
+    RemoveGroupSourceOperator,
+    UndoPlacementOperator,
+    RedoPlacementOperator,
     UpdatePlacementOperator,
+    ExportPlacementsOperator,
+    ImportPlacementsOperator,
+    PlacementGroupList,
     RandomPlacementPanel,
 )
 
@@ -807,8 +2051,30 @@ def register():
     for cls in classes:
         bpy.utils.register_class(cls)
     bpy.types.Scene.random_placement_props = bpy.props.PointerProperty(type=RandomPlacementProperties)
+    bpy.app.handlers.load_post.append(clear_placement_history_on_load)
+    bpy.app.handlers.load_post.append(clear_points_cache)
+    bpy.app.handlers.load_post.append(clear_sampler_cache)
+    bpy.app.handlers.load_post.append(fill_data_sizes_on_load)
+    bpy.app.handlers.undo_post.append(clear_points_cache)
+    bpy.app.handlers.redo_post.append(clear_points_cache)
+    bpy.app.handlers.undo_post.append(resync_history_snapshots)
+    bpy.app.handlers.redo_post.append(resync_history_snapshots)
+    bpy.app.handlers.save_pre.append(materialize_shared_points_on_save)
 
 def unregister():
+    for handlers, handler in (
+        (bpy.app.handlers.load_post, clear_placement_history_on_load),
+        (bpy.app.handlers.load_post, clear_points_cache),
+        (bpy.app.handlers.load_post, clear_sampler_cache),
+        (bpy.app.handlers.load_post, fill_data_sizes_on_load),
+        (bpy.app.handlers.undo_post, clear_points_cache),
+        (bpy.app.handlers.redo_post, clear_points_cache),
+        (bpy.app.handlers.undo_post, resync_history_snapshots),
+        (bpy.app.handlers.redo_post, resync_history_snapshots),
+        (bpy.app.handlers.save_pre, materialize_shared_points_on_save),
+    ):
+        if handler in handlers:
+            handlers.remove(handler)
     del bpy.types.Scene.random_placement_props
     for cls in reversed(classes):
         bpy.utils.unregister_class(cls)